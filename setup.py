@@ -8,9 +8,11 @@ setup(name='tap-copper',
       author='Fishtown Analytics',
       url='http://fishtownanalytics.com',
       classifiers=['Programming Language :: Python :: 3 :: Only'],
+      python_requires='>=3.8,<3.10',
       py_modules=['tap_copper'],
       install_requires=[
           'tap-framework==0.0.4',
+          'orjson==3.8.3',
       ],
       extras_require={
         'dev': [
@@ -1,17 +1,56 @@
 #!/usr/bin/env python3
 
+import sys
+
+import orjson
 import singer
 
 import tap_framework
 
-from tap_copper.client import CopperClient
+from tap_copper.cache import get_catalog_cache_path, read_cache, \
+    remove_stale_catalogs, write_cache
+from tap_copper.config import get_flag, get_number
 from tap_copper.streams import AVAILABLE_STREAMS
 
 LOGGER = singer.get_logger()  # noqa
 
 
 class CopperRunner(tap_framework.Runner):
-    pass
+
+    def generate_catalog(self):
+        catalog = []
+
+        for available_stream in self.available_streams:
+            stream = available_stream(self.config, self.state, None, None)
+
+            catalog += stream.generate_catalog()
+
+        return orjson.dumps({'streams': catalog},
+                            option=orjson.OPT_INDENT_2 |
+                            orjson.OPT_APPEND_NEWLINE)
+
+    def do_discover(self):
+        LOGGER.info("Starting discovery.")
+
+        use_cache = get_flag(self.config, 'catalog_cache', True)
+        payload = None
+
+        if use_cache:
+            cache_path = get_catalog_cache_path()
+            payload = read_cache(cache_path, get_number(
+                self.config, 'catalog_cache_ttl', None, float))
+
+        if payload is None:
+            payload = self.generate_catalog()
+
+            if use_cache:
+                write_cache(cache_path, payload)
+                remove_stale_catalogs(cache_path)
+        else:
+            LOGGER.info('Using cached catalog from {}'.format(cache_path))
+
+        sys.stdout.buffer.write(payload)
+        sys.stdout.buffer.flush()
 
 
 @singer.utils.handle_top_exception(LOGGER)
@@ -19,12 +58,19 @@ def main():
     args = singer.utils.parse_args(required_config_keys=[
         'token',
         'email'])
-    client = CopperClient(args.config)
-    runner = CopperRunner(args, client, AVAILABLE_STREAMS)
 
     if args.discover:
+        # Discovery only reads the bundled schemas, so skip importing and
+        # building the HTTP client.
+        runner = CopperRunner(args, None, AVAILABLE_STREAMS)
         runner.do_discover()
     else:
+        from tap_copper.client import CopperClient  # pylint: disable=import-outside-toplevel
+
+        client = CopperClient(args.config)
+        client.check_credentials()
+
+        runner = CopperRunner(args, client, AVAILABLE_STREAMS)
         runner.do_sync()
 
 
@@ -1,3 +1,104 @@
+import glob
+import hashlib
+import os
+import time
+
 from collections import defaultdict
+from importlib import metadata
+
+import singer
+
+LOGGER = singer.get_logger()
 
 RESOURCES = defaultdict(set)
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'tap-copper')
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Distributions whose code shapes the discovered catalog.
+CATALOG_DISTRIBUTIONS = ('tap-copper', 'singer-python', 'tap-framework',
+                         'orjson')
+
+
+def get_distribution_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return ''
+
+
+def fingerprint(paths, extra=()):
+    digest = hashlib.blake2b(digest_size=16)
+
+    for value in extra:
+        digest.update('{}\n'.format(value).encode('utf-8'))
+
+    for path in sorted(paths):
+        stat = os.stat(path)
+        digest.update('{}:{}:{}\n'.format(
+            os.path.relpath(path, PACKAGE_DIR),
+            stat.st_mtime_ns,
+            stat.st_size).encode('utf-8'))
+
+    return digest.hexdigest()
+
+
+def get_catalog_cache_path():
+    # The catalog is derived from the bundled schemas, the stream classes
+    # (key properties) and the serializer in __init__.py, so a change to
+    # any of them, or an upgrade of the libraries involved, busts the cache.
+    paths = glob.glob(os.path.join(PACKAGE_DIR, 'schemas', '*.json')) + \
+        glob.glob(os.path.join(PACKAGE_DIR, 'streams', '*.py')) + \
+        [os.path.join(PACKAGE_DIR, '__init__.py')]
+    versions = ['{}=={}'.format(name, get_distribution_version(name))
+                for name in CATALOG_DISTRIBUTIONS]
+
+    return os.path.join(CACHE_DIR, 'catalog-{}.json'.format(
+        fingerprint(paths, versions)))
+
+
+def remove_stale_catalogs(current_path):
+    # Every schema, stream or library change yields a new fingerprint, so
+    # catalogs cached under older ones can never be read again.
+    for path in glob.glob(os.path.join(CACHE_DIR, 'catalog-*.json')):
+        if path == current_path:
+            continue
+
+        try:
+            os.remove(path)
+        except OSError as e:
+            LOGGER.warning('Could not remove cache file {}: {}'.format(
+                path, e))
+
+
+def get_http_cache_path(*key_parts):
+    digest = hashlib.blake2b(
+        '\n'.join(key_parts).encode('utf-8'), digest_size=16)
+
+    return os.path.join(CACHE_DIR, 'http', '{}.json'.format(
+        digest.hexdigest()))
+
+
+def read_cache(path, ttl=None):
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+            return None
+
+        with open(path, 'rb') as handle:
+            return handle.read()
+    except OSError:
+        return None
+
+
+def write_cache(path, payload):
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(tmp_path, 'wb') as handle:
+            handle.write(payload)
+
+        os.replace(tmp_path, path)
+    except OSError as e:
+        LOGGER.warning('Could not write cache file {}: {}'.format(path, e))
@@ -1,35 +1,247 @@
+import random
+import time
+
+from urllib.parse import urlencode
+
+import orjson
 import requests
 import singer
 import singer.metrics
 
+from tap_copper.cache import get_http_cache_path, read_cache, \
+    write_cache
+from tap_copper.config import get_base_url, get_flag, get_number, \
+    get_page_concurrency
+from tap_copper.exceptions import CopperBackoffError, CopperServerError, \
+    ERROR_CODE_EXCEPTION_MAPPING, DEFAULT_ERROR, DEFAULT_SERVER_ERROR
+
 LOGGER = singer.get_logger()
 
+ERROR_BODY_LIMIT = 1024
+
+BODY_METHODS = frozenset(('POST', 'PUT', 'PATCH'))
+
+RETRYABLE_ERRORS = (
+    CopperBackoffError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+)
+
+
+def get_error_message(response):
+    try:
+        payload = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        payload = None
+
+    # Copper reports API errors as {"success": false, "message": ...}.
+    if isinstance(payload, dict) and payload.get('message'):
+        return payload['message']
+
+    # Non-JSON errors are usually HTML pages from a proxy; decode only the
+    # start of the body so the message stays readable and bounded, and
+    # response.text's charset detection never runs.
+    return response.content[:ERROR_BODY_LIMIT].decode(
+        'utf-8', 'replace').strip()
+
+
+def raise_for_error(response):
+    if response.status_code >= 500:
+        default = DEFAULT_SERVER_ERROR
+    else:
+        default = DEFAULT_ERROR
+
+    error = ERROR_CODE_EXCEPTION_MAPPING.get(response.status_code, default)
+
+    message = 'HTTP-error-code: {}, Error: {}'.format(
+        response.status_code,
+        get_error_message(response) or error['message'])
+
+    raise error['raise_exception'](message, response)
+
 
 class CopperClient:
 
     MAX_TRIES = 5
+    BACKOFF_FACTOR = 2
+    MAX_BACKOFF_SECONDS = 60
+    POOL_SIZE = 32
+    REQUEST_TIMEOUT = 300
 
     def __init__(self, config):
         self.config = config
+        self.token = config['token']
+        self.email = config['email']
+        self.request_timeout = get_number(
+            config, 'request_timeout', self.REQUEST_TIMEOUT, float)
+        self.http_cache = get_flag(config, 'http_cache', True)
 
-    def make_request(self, url, method, params=None, body=None):
-        LOGGER.info("Making {} request to {} ({})".format(method, url, params))
+        # One long-lived session keeps TCP/TLS connections to Copper warm
+        # across every page we request. All calls go to a single host, so
+        # one host pool is enough, but it must hold at least one connection
+        # per concurrent page request, or the extra sockets are opened and
+        # thrown away on every page.
+        pool_maxsize = max(get_number(config, 'pool_maxsize', self.POOL_SIZE),
+                           get_page_concurrency(config))
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            pool_block=False)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'X-PW-AccessToken': self.token,
+            'X-PW-Application': 'developer_api',
+            'X-PW-UserEmail': self.email
+        })
 
-        response = requests.request(
-            method,
+    def get_http_cache_path(self, url, params):
+        # Responses are per account, so the credentials are part of the key.
+        return get_http_cache_path(
+            self.email,
+            self.token,
             url,
+            urlencode(sorted((params or {}).items())))
+
+    @staticmethod
+    def read_http_cache(cache_path):
+        payload = read_cache(cache_path)
+
+        if payload is None:
+            return None
+
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            return None
+
+    @staticmethod
+    def write_http_cache(cache_path, response, data):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        if etag is None and last_modified is None:
+            return
 
-            headers={
-                'Content-Type': 'application/json',
-                'X-PW-AccessToken': self.config['token'],
-                'X-PW-Application': 'developer_api',
-                'X-PW-UserEmail': self.config['email']
-            },
-            params=params,
-            json=body)
+        write_cache(cache_path, orjson.dumps({
+            'etag': etag,
+            'last_modified': last_modified,
+            'payload': data
+        }))
+
+    def check_credentials(self):
+        """
+        Make one cheap request before syncing so bad credentials fail
+        fast instead of on the first page, and so that page starts on an
+        already warm connection. Auth errors are not retried; transient
+        ones are. Account details are never written to the HTTP cache.
+        """
+        LOGGER.info('Checking Copper credentials.')
+
+        self.make_request('{}/account'.format(get_base_url(self.config)),
+                          'GET', cache=False)
+
+    def get_retry_wait(self, error, attempt):
+        # A Retry-After from Copper is authoritative; otherwise use capped
+        # exponential backoff with full jitter so retries from concurrent
+        # requests do not line up.
+        retry_after = getattr(error, 'retry_after', None)
+
+        if retry_after is not None:
+            return retry_after
+
+        return random.uniform(0, min(
+            self.BACKOFF_FACTOR * 2 ** (attempt - 1),
+            self.MAX_BACKOFF_SECONDS))
+
+    def make_request(self, url, method, stop=None, **kwargs):
+        """
+        Make a request, retrying transient errors. `kwargs` are passed on
+        to `request`. `stop` is an optional threading.Event; once it is
+        set, the request is no longer wanted, so it is not retried and any
+        backoff is cut short.
+        """
+        for attempt in range(1, self.MAX_TRIES):
+            try:
+                return self.request(url, method, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if stop is not None and stop.is_set():
+                    raise
+
+                wait = self.get_retry_wait(e, attempt)
+                LOGGER.info('Backing off {:.1f} seconds after {} '
+                            '(attempt {} of {})'.format(
+                                wait, e.__class__.__name__,
+                                attempt, self.MAX_TRIES))
+
+                if stop is None:
+                    time.sleep(wait)
+                elif stop.wait(wait):
+                    raise
+
+        # Last attempt: any error now propagates to the caller.
+        return self.request(url, method, **kwargs)
+
+    def request(self, url, method, params=None, body=None, cache=True):
+        method = method.upper()
+
+        LOGGER.info("Making {} request to {} ({})".format(method, url, params))
+
+        headers = {}
+        kwargs = {
+            'params': params,
+            'headers': headers,
+            'timeout': self.request_timeout
+        }
+
+        # Only send a JSON body (and its Content-Type) when there is one;
+        # GETs such as custom field definitions carry no payload. orjson
+        # encodes straight to bytes, skipping requests' stdlib json.dumps.
+        if body is not None and method in BODY_METHODS:
+            kwargs['data'] = orjson.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        cache_path = None
+        cached = None
+
+        # Lookup endpoints fetched with GET rarely change, so revalidate a
+        # previously stored copy instead of downloading it again.
+        if cache and self.http_cache and method == 'GET':
+            cache_path = self.get_http_cache_path(url, params)
+            cached = self.read_http_cache(cache_path)
+
+        if cached is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        response = self.session.request(method, url, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            LOGGER.info('{} not modified, using cached response'.format(url))
+            return cached['payload']
 
         if response.status_code != 200:
             LOGGER.info('status={}'.format(response.status_code))
-            raise RuntimeError(response.text)
+            raise_for_error(response)
+
+        # Copper always answers in UTF-8 JSON, so decode the raw bytes
+        # directly instead of going through response.text. urllib3 does not
+        # enforce Content-Length, so a body cut off mid-transfer only shows
+        # up here; retry it like a server error.
+        try:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            raise CopperServerError(
+                'HTTP-error-code: {}, Error: Invalid JSON in response '
+                'body: {}'.format(response.status_code, e),
+                response) from e
+
+        if cache_path is not None:
+            self.write_http_cache(cache_path, response, data)
 
-        return response.json()
+        return data
@@ -1,9 +1,68 @@
+from datetime import datetime
+from functools import lru_cache
+
 import singer
 
 from dateutil.parser import parse
 
 LOGGER = singer.get_logger()  # noqa
 
+BASE_URL = 'https://api.prosperworks.com/developer_api/v1'
+
+
+def get_base_url(config):
+    # Lets runs go through a local long-lived proxy in front of Copper,
+    # which keeps its TLS connection warm across short tap invocations.
+    return (config.get('base_url') or BASE_URL).rstrip('/')
+
+
+def is_unset(value):
+    # Singer UIs commonly pass unset optional settings as "" or null.
+    return value is None or value == ''
+
+
+def get_number(config, key, default, convert=int):
+    value = config.get(key)
+
+    if is_unset(value):
+        return default
+
+    return convert(value)
+
+
+def get_flag(config, key, default):
+    # Flags may arrive as JSON booleans or as strings such as "false".
+    value = config.get(key)
+
+    if is_unset(value):
+        return default
+
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes', 'on')
+
+    return bool(value)
+
+
+def get_page_concurrency(config):
+    return max(1, get_number(config, 'page_concurrency', 1))
+
+
+def parse_datetime(value):
+    # start_date is normally ISO-8601, which the C-implemented
+    # fromisoformat handles far faster than dateutil's tokenizer. Keep
+    # dateutil for anything else it used to accept.
+    iso_value = value[:-1] + '+00:00' if value.endswith('Z') else value
+
+    try:
+        return datetime.fromisoformat(iso_value)
+    except ValueError:
+        return parse(value)
+
+
+@lru_cache(maxsize=None)
+def parse_start_date(start_date):
+    return int(parse_datetime(start_date).timestamp())
+
 
 def get_config_start_date(config):
-    return int(parse(config.get('start_date')).timestamp())
+    return parse_start_date(config.get('start_date'))
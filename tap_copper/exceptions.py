@@ -0,0 +1,125 @@
+import time
+
+from email.utils import parsedate_to_datetime
+
+
+class CopperError(RuntimeError):
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class CopperBackoffError(CopperError):
+    """
+    Base class for errors that are worth retrying: rate limiting and
+    server-side failures. Anything else fails the sync immediately.
+    """
+
+
+class CopperBadRequestError(CopperError):
+    pass
+
+
+class CopperUnauthorizedError(CopperError):
+    pass
+
+
+class CopperForbiddenError(CopperError):
+    pass
+
+
+class CopperNotFoundError(CopperError):
+    pass
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header, which may be either a number of seconds
+    or an HTTP date, into seconds to wait. Returns None if it is absent
+    or malformed.
+    """
+    if value is None:
+        return None
+
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at is None:
+        return None
+
+    return max(0, int(retry_at.timestamp() - time.time()))
+
+
+class CopperRateLimitError(CopperBackoffError):
+
+    def __init__(self, message, response=None):
+        super().__init__(message, response)
+        self.retry_after = None
+
+        if response is not None:
+            self.retry_after = parse_retry_after(
+                response.headers.get('Retry-After'))
+
+
+class CopperServerError(CopperBackoffError):
+    pass
+
+
+ERROR_CODE_EXCEPTION_MAPPING = {
+    400: {
+        'raise_exception': CopperBadRequestError,
+        'message': 'The request is missing or has a bad parameter.'
+    },
+    401: {
+        'raise_exception': CopperUnauthorizedError,
+        'message': 'Invalid authorization credentials.'
+    },
+    403: {
+        'raise_exception': CopperForbiddenError,
+        'message': 'User does not have permission to access the resource.'
+    },
+    404: {
+        'raise_exception': CopperNotFoundError,
+        'message': 'The resource you have specified cannot be found.'
+    },
+    429: {
+        'raise_exception': CopperRateLimitError,
+        'message': 'The API rate limit for your account has been exceeded.'
+    },
+    500: {
+        'raise_exception': CopperServerError,
+        'message': 'An error has occurred at Copper\'s end.'
+    },
+    502: {
+        'raise_exception': CopperServerError,
+        'message': 'Bad gateway.'
+    },
+    503: {
+        'raise_exception': CopperServerError,
+        'message': 'Copper is temporarily unavailable.'
+    },
+    504: {
+        'raise_exception': CopperServerError,
+        'message': 'Copper timed out answering the request.'
+    },
+}
+
+# Fallbacks for status codes missing from the mapping: unknown 5xx
+# responses are retried like the known ones, anything else is fatal.
+DEFAULT_ERROR = {
+    'raise_exception': CopperError,
+    'message': 'Unknown Error'
+}
+
+DEFAULT_SERVER_ERROR = {
+    'raise_exception': CopperServerError,
+    'message': 'Unknown Server Error'
+}
@@ -9,7 +9,7 @@ from tap_copper.streams.activities import ActivitiesStream
 from tap_copper.streams.custom_fields import CustomFieldsStream
 
 
-AVAILABLE_STREAMS = [
+AVAILABLE_STREAMS = (
     UsersStream,
     PeopleStream,
     LeadsStream,
@@ -19,7 +19,7 @@ AVAILABLE_STREAMS = [
     TasksStream,
     ActivitiesStream,
     CustomFieldsStream,
-]
+)
 
 __all__ = [
     'UsersStream',
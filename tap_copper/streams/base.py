@@ -1,9 +1,21 @@
+import os.path
+import sys
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import lru_cache
+from itertools import count
+
+import orjson
 import singer
 import singer.utils
 import singer.metrics
 
 from tap_framework.streams import BaseStream as base
-from tap_copper.config import get_config_start_date
+from tap_copper.config import get_base_url, get_config_start_date, \
+    get_number, get_page_concurrency
 from tap_copper.state import incorporate, save_state, \
     get_last_record_value_for_table
 
@@ -11,12 +23,74 @@ from tap_copper.state import incorporate, save_state, \
 
 LOGGER = singer.get_logger()
 
+SCHEMAS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schemas')
+
+
+@lru_cache(maxsize=None)
+def load_schema(path):
+    # Schemas are static for the life of the process, and discovery asks
+    # for each one more than once; read and parse every file only once.
+    # Callers must treat the returned dict as read-only.
+    with open(path, 'rb') as handle:
+        return orjson.loads(handle.read())
+
 
 class BaseStream(base):
     KEY_PROPERTIES = ['id']
+    MAX_PAGE_SIZE = 200
+
+    def __init__(self, config, state, catalog, client):
+        super().__init__(config, state, catalog, client)
+
+        # The catalog entry does not change during a sync, so convert its
+        # schema and metadata once instead of for every record.
+        self.schema_dict = None
+        self.metadata_map = {}
+
+        if catalog is not None:
+            self.schema_dict = catalog.schema.to_dict()
+
+            if catalog.metadata is not None:
+                self.metadata_map = singer.metadata.to_map(catalog.metadata)
+
+    def get_schema(self):
+        return load_schema(
+            os.path.join(SCHEMAS_DIR, '{}.json'.format(self.TABLE)))
+
+    def get_metadata(self, properties):
+        # Build singer's list-form metadata directly instead of writing it
+        # field by field through singer.metadata and converting at the end.
+        key_properties = set(self.KEY_PROPERTIES)
+
+        mdata = [{'breadcrumb': (), 'metadata': {'inclusion': 'available'}}]
+
+        for field_name in properties:
+            if field_name in key_properties:
+                inclusion = 'automatic'
+            else:
+                inclusion = 'available'
+
+            mdata.append({
+                'breadcrumb': ('properties', field_name),
+                'metadata': {'inclusion': inclusion}
+            })
+
+        return mdata
+
+    def generate_catalog(self):
+        schema = self.get_schema()
+
+        return [{
+            'tap_stream_id': self.TABLE,
+            'stream': self.TABLE,
+            'key_properties': self.KEY_PROPERTIES,
+            'schema': schema,
+            'metadata': self.get_metadata(schema.get('properties'))
+        }]
 
     def get_url(self):
-        return 'https://api.prosperworks.com/developer_api/v1{}'.format(self.path)
+        return get_base_url(self.config) + self.path
 
     def get_body(self, page_number=1, page_size=200):
         body = {
@@ -25,62 +99,157 @@ class BaseStream(base):
             'sort_by': "date_modified",
             'sort_direction': "asc"
         }
-        body.update(self.custom_body())
+
+        # Filters with no value (e.g. no bookmark and no start_date) are
+        # left out, so the stream falls back to a full sync.
+        body.update((key, value) for key, value in self.custom_body().items()
+                    if value is not None)
 
         return body
 
     def custom_body(self):
         return {}
 
+    def get_page_size(self):
+        # Copper caps search pages at 200 records; smaller pages bound how
+        # much of a response is held in memory at once.
+        page_size = get_number(self.config, 'page_size', self.MAX_PAGE_SIZE)
+
+        return max(1, min(page_size, self.MAX_PAGE_SIZE))
+
     def get_params(self):
         return {}
 
+    def request_page(self, url, params, body, page_number, stop=None):
+        page_body = dict(body, page_number=page_number)
+
+        return self.client.make_request(
+            url, self.API_METHOD, params=params, body=page_body, stop=stop)
+
+    def get_pages(self, url, params, body):
+        """
+        Yield (page_number, response) pairs in page order, keeping up to
+        `page_concurrency` page requests in flight at once. The next
+        request is always queued before a page is handed back, so it
+        downloads while the current page is being written.
+        """
+        concurrency = get_page_concurrency(self.config)
+        page_numbers = count(body['page_number'])
+        pending = deque()
+
+        # Set once paging ends, so requests still in flight for pages past
+        # the end give up instead of retrying while the executor waits.
+        stop = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+            def fill():
+                while len(pending) < concurrency:
+                    page_number = next(page_numbers)
+                    pending.append((page_number, executor.submit(
+                        self.request_page, url, params, body, page_number,
+                        stop)))
+
+            try:
+                fill()
+
+                while True:
+                    current_page, future = pending.popleft()
+                    response = future.result()
+
+                    # An empty page ends the stream; don't request past it.
+                    if not response:
+                        yield current_page, response
+                        return
+
+                    fill()
+
+                    yield current_page, response
+            finally:
+                stop.set()
+
+                for _, future in pending:
+                    future.cancel()
+
+    def process_page(self, response):
+        """
+        Transform one API response and write its records, returning the
+        transformed records.
+        """
+        transformed = self.get_stream_data(response)
+
+        with singer.metrics.record_counter(endpoint=self.TABLE) as counter:
+            self.write_records(self.TABLE, transformed)
+            counter.increment(len(transformed))
+
+        return transformed
+
     def sync_data(self):
         table = self.TABLE
 
         LOGGER.info('Syncing data for {}'.format(table))
         url = self.get_url()
         params = self.get_params()
-        body = self.get_body()
+        body = self.get_body(page_size=self.get_page_size())
 
-        while True:
-            response = self.client.make_request(url, self.API_METHOD, params=params, body=body)
-            transformed = self.get_stream_data(response)
+        with closing(self.get_pages(url, params, body)) as pages:
+            for page_number, response in pages:
+                transformed = self.process_page(response)
 
-            with singer.metrics.record_counter(endpoint=table) as counter:
-                singer.write_records(table, transformed)
-                counter.increment(len(transformed))
+                LOGGER.info('Synced page {} for {}'.format(page_number, table))
 
-            page_number = body['page_number']
-            LOGGER.info('Synced page {} for {}'.format(page_number, table))
+                if len(transformed) == 0:
+                    break
 
-            if len(transformed) == 0:
-                break
-
-            body['page_number'] += 1
-            self.save_state(transformed[-1])
+                self.save_state(transformed[-1])
 
         return self.state
 
+    @staticmethod
+    def write_records(table, records):
+        # singer.write_records flushes stdout after every record; emit a
+        # whole page with one write and one flush instead.
+        if not records:
+            return
+
+        sys.stdout.write(''.join(
+            singer.format_message(
+                singer.RecordMessage(stream=table, record=record)) + '\n'
+            for record in records))
+        sys.stdout.flush()
+
     def get_start_date(self):
         bookmark = get_last_record_value_for_table(self.state, self.TABLE)
         if bookmark:
             return bookmark
 
+        # start_date is optional; without it there is nothing to filter on.
+        if not self.config.get('start_date'):
+            return None
+
         return get_config_start_date(self.config)
 
     def save_state(self, last_record):
         if 'date_modified' in last_record:
             date_modified = last_record['date_modified']
+            previous = get_last_record_value_for_table(self.state, self.TABLE)
             self.state = incorporate(self.state, self.TABLE, "date_modified", date_modified)
-            save_state(self.state)
+
+            # Only emit STATE when the bookmark actually moved forward.
+            if get_last_record_value_for_table(self.state, self.TABLE) != previous:
+                save_state(self.state)
+
+    def transform_record(self, record, transformer):
+        return transformer.transform(
+            record, self.schema_dict, self.metadata_map)
 
     def get_stream_data(self, response):
+        transform_record = self.transform_record
 
-        transformed = []
-        for record in response:
+        # tap_framework opened a Transformer per record, which also logged
+        # its filtered/removed field summary once per record. Share one
+        # across the page instead.
+        with singer.Transformer() as transformer:
             ## removes fields with missing/wrong data type
-            record = self.transform_record(record)
-            transformed.append(record)
-
-        return transformed
+            return [transform_record(record, transformer)
+                    for record in response]
@@ -13,3 +13,8 @@ class CompaniesStream(BaseStream):
     @property
     def path(self):
         return '/companies/search'
+
+    def custom_body(self):
+        return {
+            "minimum_modified_date": self.get_start_date()
+        }
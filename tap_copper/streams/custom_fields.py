@@ -21,11 +21,7 @@ class CustomFieldsStream(BaseStream):
         url = self.get_url()
 
         response = self.client.make_request(url, self.API_METHOD)
-        transformed = self.get_stream_data(response)
-
-        with singer.metrics.record_counter(endpoint=table) as counter:
-            singer.write_records(table, transformed)
-            counter.increment(len(transformed))
+        self.process_page(response)
 
         LOGGER.info('Synced {}'.format(table))
 
@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+
+from contextlib import closing
+from unittest import mock
+
+from tap_copper.client import CopperClient
+from tap_copper.exceptions import CopperServerError
+from tap_copper.streams.leads import LeadsStream
+
+
+class FakeClient:
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def make_request(self, url, method, params=None, body=None, stop=None):
+        with self.lock:
+            self.requested.append(body['page_number'])
+
+        if body['page_number'] <= len(self.pages):
+            return self.pages[body['page_number'] - 1]
+
+        return []
+
+
+def make_pages(count, size=2):
+    return [[{'id': page * size + i} for i in range(size)]
+            for page in range(count)]
+
+
+class TestGetPages(unittest.TestCase):
+
+    def get_pages(self, client, concurrency):
+        stream = LeadsStream({'page_concurrency': concurrency}, {}, None,
+                             client)
+        body = stream.get_body(page_size=2)
+
+        with closing(stream.get_pages(stream.get_url(), {}, body)) as pages:
+            return list(pages)
+
+    def test_yields_pages_in_order_until_empty(self):
+        pages = make_pages(5)
+
+        for concurrency in (1, 2, 4):
+            with self.subTest(concurrency=concurrency):
+                client = FakeClient(pages)
+
+                result = self.get_pages(client, concurrency)
+
+                self.assertEqual([number for number, _ in result],
+                                 [1, 2, 3, 4, 5, 6])
+                self.assertEqual([response for _, response in result],
+                                 pages + [[]])
+
+    def test_short_page_does_not_end_paging(self):
+        pages = [[{'id': 1}], [{'id': 2}, {'id': 3}]]
+
+        result = self.get_pages(FakeClient(pages), 1)
+
+        self.assertEqual([response for _, response in result], pages + [[]])
+
+    def test_stops_requesting_after_empty_page(self):
+        client = FakeClient(make_pages(2))
+
+        self.get_pages(client, 1)
+
+        self.assertEqual(client.requested, [1, 2, 3])
+
+    def test_requests_past_the_end_are_not_retried(self):
+        client = CopperClient({'token': 'token',
+                               'email': 'user@example.com'})
+        attempts = []
+
+        def request(url, method, params=None, body=None, cache=True):
+            page_number = body['page_number']
+
+            if page_number == 1:
+                return []
+
+            # Still in flight when the empty first page ends paging.
+            attempts.append(page_number)
+            time.sleep(0.2)
+            raise CopperServerError('unavailable')
+
+        with mock.patch.object(client, 'request', side_effect=request), \
+                mock.patch.object(client, 'get_retry_wait', return_value=30):
+            started = time.time()
+            result = self.get_pages(client, 3)
+            elapsed = time.time() - started
+
+        self.assertEqual(result, [(1, [])])
+        self.assertEqual(sorted(attempts), [2, 3])
+        self.assertLess(elapsed, 5)
@@ -0,0 +1,101 @@
+import threading
+import unittest
+
+from unittest import mock
+
+import requests
+
+from tap_copper.client import CopperClient
+from tap_copper.exceptions import CopperServerError, \
+    CopperUnauthorizedError, CopperRateLimitError
+
+URL = 'https://api.example.com/people/search'
+
+
+def make_response(status_code, content=b'[]', headers=None):
+    return mock.Mock(status_code=status_code,
+                     content=content,
+                     headers=headers or {},
+                     url=URL)
+
+
+class TestMakeRequest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = CopperClient({
+            'token': 'token',
+            'email': 'user@example.com',
+            'http_cache': False
+        })
+
+        sleep = mock.patch('tap_copper.client.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def request(self, *responses, stop=None):
+        with mock.patch.object(self.client.session, 'request',
+                               side_effect=responses) as session_request:
+            try:
+                return self.client.make_request(
+                    URL, 'POST', body={'page_number': 1}, stop=stop)
+            finally:
+                self.calls = session_request.call_count
+
+    def test_success(self):
+        self.assertEqual(
+            self.request(make_response(200, b'[{"id": 1}]')), [{'id': 1}])
+        self.assertEqual(self.calls, 1)
+
+    def test_retries_server_errors(self):
+        self.assertEqual(
+            self.request(make_response(503), make_response(200, b'[]')), [])
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.sleep.call_count, 1)
+
+    def test_retries_connection_errors(self):
+        for error in (requests.exceptions.ConnectionError,
+                      requests.exceptions.Timeout,
+                      requests.exceptions.ChunkedEncodingError,
+                      requests.exceptions.ContentDecodingError):
+            with self.subTest(error=error.__name__):
+                self.assertEqual(
+                    self.request(error(), make_response(200, b'[]')), [])
+                self.assertEqual(self.calls, 2)
+
+    def test_retries_truncated_body(self):
+        self.assertEqual(
+            self.request(make_response(200, b'[{"id": 1'),
+                         make_response(200, b'[{"id": 1}]')),
+            [{'id': 1}])
+        self.assertEqual(self.calls, 2)
+
+    def test_does_not_retry_client_errors(self):
+        with self.assertRaises(CopperUnauthorizedError):
+            self.request(make_response(401, b'{"message": "bad token"}'))
+
+        self.assertEqual(self.calls, 1)
+        self.sleep.assert_not_called()
+
+    def test_gives_up_after_max_tries(self):
+        responses = [make_response(500)] * CopperClient.MAX_TRIES
+
+        with self.assertRaises(CopperServerError):
+            self.request(*responses)
+
+        self.assertEqual(self.calls, CopperClient.MAX_TRIES)
+
+    def test_waits_for_retry_after(self):
+        self.request(make_response(429, headers={'Retry-After': '12'}),
+                     make_response(200, b'[]'))
+
+        self.sleep.assert_called_once_with(12)
+
+    def test_stop_prevents_retry(self):
+        stop = threading.Event()
+        stop.set()
+
+        with self.assertRaises(CopperRateLimitError):
+            self.request(make_response(429), make_response(200, b'[]'),
+                         stop=stop)
+
+        self.assertEqual(self.calls, 1)
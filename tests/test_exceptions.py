@@ -0,0 +1,32 @@
+import time
+import unittest
+
+from email.utils import formatdate
+
+from tap_copper.exceptions import parse_retry_after
+
+
+class TestParseRetryAfter(unittest.TestCase):
+
+    def test_missing(self):
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after('7'), 7)
+        self.assertEqual(parse_retry_after(7), 7)
+
+    def test_negative_seconds_are_clamped(self):
+        self.assertEqual(parse_retry_after('-3'), 0)
+
+    def test_http_date_in_the_future(self):
+        wait = parse_retry_after(formatdate(time.time() + 30, usegmt=True))
+
+        self.assertTrue(25 <= wait <= 30, wait)
+
+    def test_http_date_in_the_past(self):
+        self.assertEqual(
+            parse_retry_after(formatdate(time.time() - 30, usegmt=True)), 0)
+
+    def test_malformed(self):
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(''))